@@ -10,9 +10,16 @@ import datetime
 import tracemalloc
 import time
 import hashlib
+import os
+import sys
+import contextlib
 from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
 from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 __version__ = "0.12.0"
@@ -25,30 +32,52 @@ SCHEMA = [
     "pagamento_fatura_anterior"
 ]
 
+ROW_TEMPLATE = dict.fromkeys(SCHEMA, "")
+REQUIRED_FIELDS = ("card_last4", "post_date", "desc_raw", "valor_brl", "categoria_high", "ledger_hash")
+MONEY_FIELDS = ("valor_brl", "valor_orig", "valor_usd", "iof_brl")  # centavos (int) até a escrita do CSV; fx_rate fica Decimal
+MONEY_IDX = tuple(SCHEMA.index(k) for k in MONEY_FIELDS)
+ROW_VALUES = itemgetter(*SCHEMA)
+
 # --- Regexes
 RE_DATE = re.compile(r"(?P<d>\d{1,3})/(?P<m>\d{1,2})(?:/(?P<y>\d{4}))?")
 RE_PAY_HDR  = re.compile(r"Pagamentos efetuados", re.I)
 RE_BRL = re.compile(r"-?\s*\d{1,3}(?:\.\d{3})*,\d{2}")
-RE_PAY_LINE = re.compile(r"^(?P<date>\d{1,3}/\d{1,2}(?:/\d{4})?)\s+PAGAMENTO(\s+EFETUADO)?\s+7117\s*[-\t ]+(?P<amt>-\s*[\d.,]+)\s*$", re.I)
-RE_PAY_LINE_ANY = re.compile(
-    r"^(?P<date>\d{1,3}/\d{1,2}(?:/\d{4})?)\s+PAGAMENTO.*?(?P<amt>-?\s*[\d.,]+)\s*$", re.I
-)
-RE_FX_L2_TOL = re.compile(r"^(.+?)\s+([\d.,]+)\s+([A-Z]{3})\s+([\d.,]+)$")
-# Nova regex para moedas variadas e tolerância a espaços extras
-RE_FX_L2_TOL_ANY = re.compile(r"^(.+?)\s+([\d.,]+)\s+([A-Z]{3})\s+([\d.,]+)$", re.I)
 RE_FX_BRL   = re.compile(r"^(?P<date>\d{1,2}/\d{1,2})(?:/\d{4})?\s+(?P<city>.+?)\s+(?P<orig>[\d.,]+)\s+(?P<cur>[A-Z]{3})\s+(?P<brl>[\d.,]+)$")
-RE_IOF_LINE = re.compile(r"Repasse de IOF em R\$[\s]*([\d.,]+)", re.I)
 RE_FX_MAIN  = re.compile(r"^\$?(?P<date>\d{1,3}/\d{2})(?:/\d{4})?\s+(?P<desc>.+?)\s+(?P<orig>[\d.,]+)\s+(?P<cur>[A-Z]{3})\s+(?P<usd>[\d.,]+)$")
 RE_FX_L2    = re.compile(r"^(?P<city>.+?)\s+(?P<orig>[\d.,]+)\s+(?P<cur>[A-Z]{3})\s+(?P<usd>[\d.,]+)$")
-RE_FX_RATE  = re.compile(r"D[oó]lar de Convers[aã]o R\$ (?P<fx>[\d.,]+)")
-RE_DOM      = re.compile(r"^(?P<date>\d{1,3}/\d{1,2})\s+(?P<desc>.+?)\s+(?P<amt>[-\d.,]+)$")
+# Bloco FX de 3 linhas (data/desc/BRL, cidade/valor/moeda/USD, cotação) sobre o texto limpo unido por \n;
+# [^\S\n] impede que um separador atravesse a quebra de linha
+RE_FX_BLOCK = re.compile(
+    r"^\d{1,3}/\d{1,2}.*\n"
+    r"(?P<city>.+)[^\S\n]+(?P<orig>[\d.,]+)[^\S\n]+(?P<cur>(?i:[A-Z]{3}))[^\S\n]+(?P<usd>[\d.,]+)$\n"
+    r".*?D[oó]lar de Convers[aã]o R\$ (?P<fx>[\d.,]+)",
+    re.M,
+)
 RE_CARD     = re.compile(r"final (\d{4})")
-RE_INST     = re.compile(r"(\d{1,2})/(\d{1,2})")
-RE_INST_TXT = re.compile(r"\+\s*(\d+)\s*x\s*R\$")
+# Parcelas: cada alternativa só é tentada se as anteriores não casam em nenhuma posição
+RE_PARC     = re.compile(
+    r".*?(?P<seq>\d{1,2})/(?P<tot>\d{1,2})"                # 03/10
+    r"|.*?\+\s*\d+\s*x\s*R\$"                               # + 9x R$ (sem sequência)
+    r"|.*?(?i:(?P<seq_s>\d{1,2})\s*/\s*(?P<tot_s>\d{1,2})"  # 03 / 10
+    r"|(?P<seq_x>\d{1,2})\s*x\s*R\$"                        # 3x R$
+    r"|(?P<seq_de>\d{1,2})\s*de\s*(?P<tot_de>\d{1,2}))"     # 3 de 10
+)
 RE_AJUSTE_NEG = re.compile(r"^(?P<date>\d{1,3}/\d{1,2})\s+.+?\s+(?P<amt>-\s*0,\d{2})$")
 RE_ROUND    = re.compile(r"^(?P<date>\d{1,3}/\d{1,2})\s+-?(?P<amt>0,\d{2})$")
 RE_DROP_HDR = re.compile(r"^(Total |Lançamentos|Limites|Encargos|Próxima fatura|Demais faturas|Parcelamento da fatura|Simulação|Pontos|Cashback|Outros lançamentos|Limite total de crédito|Fatura anterior|Saldo financiado|Produtos e serviços|Tarifa|Compras parceladas - próximas faturas)", re.I)
 LEAD_SYM = ">@§$Z)_•*®«» "
+RE_NUM_JUNK = re.compile(r"[^\d,\-]")
+RE_WS_RUN = re.compile(r"\s{2,}")  # só sequências: um TAB isolado é preservado (entra no ledger_hash)
+# Linha única: pagamento | doméstica | data sem match (descartada) | IOF | encargos
+RE_LINE = re.compile(
+    r"(?P<pay>(?P<pay_date>\d{1,3}/\d{1,2}(?:/\d{4})?)\s+PAGAMENTO.*?(?P<pay_amt>-?\s*[\d.,]+)\s*$)"
+    r"|(?P<dom>(?P<dom_date>\d{1,3}/\d{1,2})\s+(?P<dom_desc>.+?)\s+(?P<dom_amt>[-\d.,]+)$)"
+    r"|(?P<date>\d{1,3}/\d{1,2})"
+    r"|(?P<iof>.*?Repasse de IOF em R\$\s*(?P<iof_amt>[\d.,]+))"
+    r"|(?P<enc>.*?(?:JUROS|MULTA|IOF DE FINANCIAMENTO))",
+    re.I,
+)
+LINE_KEYWORDS = ("iof", "juros", "multa")  # literais exigidos pelos ramos iof/enc de RE_LINE
 
 # Regex para FX e pagamentos
 FX_LINE1 = re.compile(r"^\d{2}/\d{2} (.+?) (\d{1,3}(?:\.\d{3})*,\d{2})$")
@@ -56,8 +85,25 @@ FX_LINE2 = re.compile(r"^(.+?) (\d{1,3}(?:\.\d{3})*,\d{2}) (EUR|USD|GBP|CHF) (\d
 FX_RATE = re.compile(r"D[óo]lar de Convers[ãa]o R\$ (\d{1,3}(?:\.\d{3})*,\d{2})")
 PAGAMENTO = re.compile(r"^\d{2}/\d{2} PAGAMENTO.*?7117.*?(-?\d{1,3}(?:\.\d{3})*,\d{2})$")
 
-def decomma(x: str) -> Decimal:
-    return Decimal(re.sub(r"[^\d,\-]", "", x.replace(' ', '')).replace('.', '').replace(',', '.'))
+def decomma(x: str) -> int:
+    # "-9.232,62" → -923262 (centavos); a 3ª casa decimal, se houver, arredonda para cima
+    s = RE_NUM_JUNK.sub("", x)
+    neg = "-" in s
+    whole, _, frac = (s.replace("-", "") if neg else s).partition(",")
+    if len(frac) == 2:  # caso comum: "1.234,56"
+        cents = int(whole or 0) * 100 + int(frac)
+    else:
+        cents = int(whole or 0) * 100 + int(frac[:2].ljust(2, "0")) + (frac[2:3] >= "5")
+    return -cents if neg else cents
+
+def decomma_rate(x: str) -> Decimal:
+    # Cotação não é valor monetário: mantém todas as casas ("5,4321" → Decimal("5.4321"))
+    return Decimal(RE_NUM_JUNK.sub("", x).replace(",", "."))
+
+def fmt_cents(v):
+    # Centavos → "-9232.62"; campos vazios passam intactos
+    if v in ("", None): return v
+    return f"{'-' if v < 0 else ''}{abs(v) // 100}.{abs(v) % 100:02d}"
 
 def norm_date(date, ry, rm):
     if not date: return ""
@@ -68,88 +114,95 @@ def norm_date(date, ry, rm):
     if not mth: mth = rm
     return f"{int(y):04}-{int(mth):02}-{int(d):02}"
 
-def sha1(card, date, desc, valor_brl, installment_tot, categoria_high):
-    h = hashlib.sha1()
-    h.update(f"{card}|{date}|{desc}|{valor_brl}|{installment_tot}|{categoria_high}".encode("utf-8"))
-    return h.hexdigest()
+def ledger_digest(card, date, desc, valor_brl, installment_tot, categoria_high):
+    # BLAKE2b-128: hash de deduplicação, não criptográfico; mais barato que SHA-1 por linha
+    # Mesmo payload de antes ("a|b|...|None|CAT"); str.encode() sem argumento usa o atalho UTF-8 em C
+    payload = "|".join((card, date, desc, fmt_cents(valor_brl), str(installment_tot), categoria_high)).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
 
-def classify(desc, amt):
-    d = desc.upper()
+AJUSTE_MAX = 30  # centavos
+# Palavra-chave → categoria; a ordem da lista é a prioridade em classify()
+CATEGORY_KEYWORDS = (
+    ("ACELERADOR", "SERVIÇOS"),
+    ("PONTOS", "SERVIÇOS"),
+    ("ANUIDADE", "SERVIÇOS"),
+    ("SEGURO", "SERVIÇOS"),
+    ("TARIFA", "SERVIÇOS"),
+    ("PRODUTO", "SERVIÇOS"),
+    ("SERVIÇO", "SERVIÇOS"),
+    # ... demais categorias já existentes ...
+    ("SUPERMERC", "SUPERMERCADO"),
+    ("FARMAC", "FARMÁCIA"),
+    ("DROG", "FARMÁCIA"),
+    ("PANVEL", "FARMÁCIA"),
+    ("RESTAUR", "RESTAURANTE"),
+    ("PIZZ", "RESTAURANTE"),
+    ("BAR", "RESTAURANTE"),
+    ("CAFÉ", "RESTAURANTE"),
+    ("POSTO", "POSTO"),
+    ("COMBUST", "POSTO"),
+    ("GASOLIN", "POSTO"),
+    ("UBER", "TRANSPORTE"),
+    ("TAXI", "TRANSPORTE"),
+    ("TRANSP", "TRANSPORTE"),
+    ("PASSAGEM", "TRANSPORTE"),
+    ("AEROPORTO", "TURISMO"),
+    ("HOTEL", "TURISMO"),
+    ("TUR", "TURISMO"),
+    ("ENTRETENIM", "TURISMO"),
+    ("ALIMENT", "ALIMENTAÇÃO"),
+    ("IFD", "ALIMENTAÇÃO"),
+    ("SAUD", "SAÚDE"),
+    ("VEIC", "VEÍCULOS"),
+    ("VEST", "VESTUÁRIO"),
+    ("LOJA", "VESTUÁRIO"),
+    ("MAGAZINE", "VESTUÁRIO"),
+    ("EDU", "EDUCAÇÃO"),
+    ("HOBBY", "HOBBY"),
+    ("DIVERS", "DIVERSOS"),
+)
+
+@lru_cache(maxsize=8192)
+def classify_desc(d):
+    # Regras que dependem só da descrição (já em maiúsculas); None = sem categoria
     if "7117" in d: return "PAGAMENTO"
-    if "AJUSTE" in d or (abs(amt) <= Decimal("0.30") and abs(amt) > 0): return "AJUSTE"
-    if any(k in d for k in ("IOF", "JUROS", "MULTA")): return "ENCARGOS"
-    mapping = [
-        ("ACELERADOR", "SERVIÇOS"),
-        ("PONTOS", "SERVIÇOS"),
-        ("ANUIDADE", "SERVIÇOS"),
-        ("SEGURO", "SERVIÇOS"),
-        ("TARIFA", "SERVIÇOS"),
-        ("PRODUTO", "SERVIÇOS"),
-        ("SERVIÇO", "SERVIÇOS"),
-        # ... demais categorias já existentes ...
-        ("SUPERMERC", "SUPERMERCADO"),
-        ("FARMAC", "FARMÁCIA"),
-        ("DROG", "FARMÁCIA"),
-        ("PANVEL", "FARMÁCIA"),
-        ("RESTAUR", "RESTAURANTE"),
-        ("PIZZ", "RESTAURANTE"),
-        ("BAR", "RESTAURANTE"),
-        ("CAFÉ", "RESTAURANTE"),
-        ("POSTO", "POSTO"),
-        ("COMBUST", "POSTO"),
-        ("GASOLIN", "POSTO"),
-        ("UBER", "TRANSPORTE"),
-        ("TAXI", "TRANSPORTE"),
-        ("TRANSP", "TRANSPORTE"),
-        ("PASSAGEM", "TRANSPORTE"),
-        ("AEROPORTO", "TURISMO"),
-        ("HOTEL", "TURISMO"),
-        ("TUR", "TURISMO"),
-        ("ENTRETENIM", "TURISMO"),
-        ("ALIMENT", "ALIMENTAÇÃO"),
-        ("IFD", "ALIMENTAÇÃO"),
-        ("SAUD", "SAÚDE"),
-        ("VEIC", "VEÍCULOS"),
-        ("VEST", "VESTUÁRIO"),
-        ("LOJA", "VESTUÁRIO"),
-        ("MAGAZINE", "VESTUÁRIO"),
-        ("EDU", "EDUCAÇÃO"),
-        ("HOBBY", "HOBBY"),
-        ("DIVERS", "DIVERSOS"),
-    ]
-    for k, v in mapping:
+    if "AJUSTE" in d: return "AJUSTE"
+    if "IOF" in d or "JUROS" in d or "MULTA" in d: return "ENCARGOS"
+    for k, v in CATEGORY_KEYWORDS:
         if k in d: return v
     if "EUR" in d or "USD" in d or "FX" in d: return "FX"
+    return None
+
+def classify(desc, amt):
+    cat = classify_desc(desc.upper())
+    if cat == "PAGAMENTO": return cat
+    if cat == "AJUSTE" or (abs(amt) <= AJUSTE_MAX and abs(amt) > 0): return "AJUSTE"
+    if cat: return cat
     print(f"[CAT-SUSPEITA] {desc}")
     return "DIVERSOS"
 
 def build(card, date, desc, valor_brl, cat, ry, rm, **kv):
     norm = norm_date(date, ry, rm) if date else ""
-    ledger = sha1(card, norm, desc, valor_brl, kv.get("installment_tot"), cat)
-    city = None
-    if cat == "FX" and "merchant_city" in kv and kv["merchant_city"]:
-        city = kv["merchant_city"]
-    elif cat == "FX" and " " in desc:
-        city = desc.split()[0].title()
-    # Remove merchant_city de kv se já está sendo passado explicitamente
-    kv = dict(kv)
-    if "merchant_city" in kv:
-        del kv["merchant_city"]
-    d = dict(card_last4=card, post_date=norm, desc_raw=desc, valor_brl=valor_brl,
-             categoria_high=cat, merchant_city=city, ledger_hash=ledger, **kv)
-    # Preenche campos obrigatórios vazios
-    for k in SCHEMA:
-        if k not in d:
-            d[k] = ""
+    ledger = ledger_digest(card, norm, desc, valor_brl, kv.get("installment_tot"), cat)
+    # kv já é um dict novo (**kv): retira merchant_city sem copiar
+    city = kv.pop("merchant_city", None)
+    if cat != "FX":
+        city = None
+    elif not city:
+        city = desc.split()[0].title() if " " in desc else None
+    # Parte do template com todos os campos do SCHEMA vazios
+    d = ROW_TEMPLATE.copy()
+    d["card_last4"] = card; d["post_date"] = norm; d["desc_raw"] = desc; d["valor_brl"] = valor_brl
+    d["categoria_high"] = cat; d["merchant_city"] = city; d["ledger_hash"] = ledger
+    d.update(kv)
     # Logging de campos obrigatórios faltando
-    obrigatorios = ["card_last4", "post_date", "desc_raw", "valor_brl", "categoria_high", "ledger_hash"]
-    for k in obrigatorios:
+    for k in REQUIRED_FIELDS:
         if not d[k]:
             print(f"[OBRIGATORIO-FALTANDO] {k} vazio em linha: {desc}")
     return d
 
 def clean(raw):
-    return re.sub(r"\s{2,}", " ", raw.lstrip(LEAD_SYM).replace("_", " ")).strip()
+    return RE_WS_RUN.sub(" ", raw.lstrip(LEAD_SYM).replace("_", " ")).strip()
 
 def compare_metrics(pdf_metrics, csv_metrics):
     def emoji(ok): return "✅" if ok else "⚠️"
@@ -166,13 +219,94 @@ def compare_metrics(pdf_metrics, csv_metrics):
             ok = val_pdf == val_csv
         print(f"[CHECK] {key}: {val_pdf} (PDF) vs {val_csv} (CSV) {emoji(ok)}")
 
-def parse_txt(path: Path, ref_y: int, ref_m: int, verbose=False):
-    rows, stats = [], Counter()
+# --- Handlers de RE_LINE: retornam True se a linha foi consumida
+def on_pay(m, line, ctx):
+    valor = decomma(m.group("pay_amt"))
+    if valor >= 0:
+        print(f"[PAGAMENTO-ERR] Pagamento positivo ignorado: {fmt_cents(valor)}")
+        return True
+    ctx["emit"](build(
+        ctx["card"], m.group("pay_date"), "PAGAMENTO", valor,
+        "PAGAMENTO", ctx["ry"], ctx["rm"], pagamento_fatura_anterior=""
+    ))
+    ctx["stats"]["pagamento"] += 1
+    ctx["last_date"] = m.group("pay_date")
+    return True
+
+def on_dom(m, line, ctx):
+    desc, amt = m.group("dom_desc"), decomma(m.group("dom_amt"))
+    if abs(amt) > 1000000 or abs(amt) <= 1:
+        print(f"[VALOR-SUSPEITO] {desc} {fmt_cents(amt)}")
+    seq, tot = None, None
+    ins = RE_PARC.match(desc)
+    if ins:
+        s = ins["seq"] or ins["seq_s"] or ins["seq_x"] or ins["seq_de"]
+        t = ins["tot"] or ins["tot_s"] or ins["tot_de"]
+        seq, tot = (int(s) if s else None), (int(t) if t else None)
+        # Só aceita parcelas do ciclo atual
+        if tot and seq and seq > tot:
+            print(f"[PARCELA-ERR] Parcela fora do ciclo: {desc}")
+            return True
+    cat = classify(desc, amt)
+    if cat == "DIVERSOS":
+        print(f"[CAT-SUSPEITA] {desc}")
+    ctx["emit"](build(ctx["card"], m.group("dom_date"), desc, amt, cat, ctx["ry"], ctx["rm"], installment_seq=seq, installment_tot=tot))
+    ctx["stats"][cat.lower()] += 1
+    ctx["last_date"] = m.group("dom_date")
+    return True
+
+def on_date(m, line, ctx):
+    # Linha iniciada por data sem formato reconhecido: descartada sem contar como miss
+    return True
+
+def on_iof(m, line, ctx):
+    valor = decomma(m.group("iof_amt"))
+    ctx["iof"].append(build(ctx["card"], ctx["last_date"] or "", "Repasse de IOF em R$", valor, "IOF", ctx["ry"], ctx["rm"], iof_brl=valor))
+    ctx["stats"]["iof"] += 1
+    return True
+
+def on_enc(m, line, ctx):
+    mval = RE_BRL.search(line)
+    if mval:
+        valor = decomma(mval.group(0))
+        if valor != 0:
+            ctx["emit"](build(ctx["card"], ctx["last_date"] or "", line, valor, "ENCARGOS", ctx["ry"], ctx["rm"]))
+            ctx["stats"]["encargos"] += 1
+            return True
+    return False
+
+HANDLERS = {"pay": on_pay, "dom": on_dom, "date": on_date, "iof": on_iof, "enc": on_enc}
+
+def write_row(writer, r):
+    # csv.writer + lista na ordem do SCHEMA: evita o lookup por chave do DictWriter
+    vals = list(ROW_VALUES(r))
+    for i in MONEY_IDX:
+        vals[i] = fmt_cents(vals[i])
+    writer.writerow(vals)
+
+def parse_txt(path: Path, ref_y: int, ref_m: int, writer, agg, verbose=False):
+    # Cada linha válida vai direto para o CSV e para o agregador; só os IOF ficam em buffer até o fim
+    stats = Counter()
     card = "0000"; iof_postings = []
     lines = path.read_text(encoding="utf-8", errors="ignore").splitlines(); stats["lines"] = len(lines)
+    # Limpeza em lote: cada linha é limpa uma única vez, inclusive as lidas pelo lookahead FX
+    cleaned = list(map(clean, lines))
+    buf = "\n".join(cleaned)
+    fx_blocks, line_no, pos = {}, 0, 0  # índice da 1ª linha → match do bloco
+    for mfx in RE_FX_BLOCK.finditer(buf):
+        line_no += buf.count("\n", pos, mfx.start()); pos = mfx.start()
+        fx_blocks[line_no] = mfx
     skip = 0
-    last_date = None
-    pagamento_count = 0
+
+    def emit(r):
+        # Filtro final antes do CSV
+        if not r["post_date"] or r["valor_brl"] in ("", None):
+            return
+        stats["postings"] += 1
+        agg.add(r)
+        write_row(writer, r)
+
+    ctx = dict(card=card, ry=ref_y, rm=ref_m, emit=emit, iof=iof_postings, stats=stats, last_date=None)
     seen_fx = set()
     i = 0
     while i < len(lines):
@@ -180,111 +314,42 @@ def parse_txt(path: Path, ref_y: int, ref_m: int, verbose=False):
             skip -= 1
             i += 1
             continue
-        line = clean(lines[i])
+        line = cleaned[i]
         # FX bloco: 3 linhas perfeitamente alinhadas
-        if RE_DATE.match(line) and i+2 < len(lines):
-            fx_line2 = clean(lines[i+1])
-            fx_line3 = clean(lines[i+2])
-            mfx2 = RE_FX_L2_TOL.match(fx_line2) or RE_FX_L2_TOL_ANY.match(fx_line2)
-            mrate = RE_FX_RATE.search(fx_line3)
-            if mfx2 and mrate:
-                parts = line.split()
-                post_date = parts[0]
-                valor_brl = decomma(parts[-1])
-                desc = " ".join(parts[1:-1])
-                merchant_city = mfx2.group(1)
-                valor_orig = decomma(mfx2.group(2))
-                moeda_orig = mfx2.group(3)
-                valor_usd = decomma(mfx2.group(4))
-                fx_rate = decomma(mrate.group(1))
-                # Checagem de duplicatas FX
-                fx_key = (desc, post_date, valor_brl, valor_orig, moeda_orig, fx_rate)
-                if fx_key in seen_fx:
-                    print(f"[DUPLICATE] Duplicata legítima confirmada: {desc} | {post_date} | {valor_brl}")
-                else:
-                    seen_fx.add(fx_key)
-                    rows.append(build(
-                        card, post_date, desc, valor_brl, "FX", ref_y, ref_m,
-                        valor_orig=valor_orig, moeda_orig=moeda_orig, valor_usd=valor_usd,
-                        fx_rate=fx_rate, merchant_city=merchant_city
-                    ))
-                    stats["fx"] += 1
-                i += 3  # AVANÇA 3 LINHAS!
-                continue
-        # Pagamentos (regex abrangente)
-        mp = RE_PAY_LINE.match(line) or RE_PAY_LINE_ANY.match(line)
-        if mp and mp.group("amt"):
-            valor = decomma(mp.group("amt"))
-            valor_final = float(valor)
-            if valor_final >= 0:
-                print(f"[PAGAMENTO-ERR] Pagamento positivo ignorado: {valor}")
-                i += 1
-                continue
-            rows.append(build(
-                card, mp.group("date"), "PAGAMENTO", valor_final,
-                "PAGAMENTO", ref_y, ref_m, pagamento_fatura_anterior=""
-            ))
-            stats["pagamento"] += 1
-            last_date = mp.group("date")
-            pagamento_count += 1
-            i += 1
-            continue
-        elif mp:
-            print(f"[PAGAMENTO-ERR] Regex de pagamento não encontrou grupo 'amt' em: {line}")
-            i += 1
-            continue
-        # Parsing de compras domésticas (fallback)
-        if RE_DATE.match(line):
-            md = RE_DOM.match(line)
-            if md:
-                desc, amt = md.group("desc"), decomma(md.group("amt"))
-                if abs(amt) > 10000 or abs(amt) < 0.01:
-                    print(f"[VALOR-SUSPEITO] {desc} {amt}")
-                re_parc = re.compile(r"(\d{1,2})\s*/\s*(\d{1,2})|(\d{1,2})\s*x\s*R\$|(\d{1,2})\s*de\s*(\d{1,2})", re.I)
-                ins = RE_INST.search(desc) or RE_INST_TXT.search(desc) or re_parc.search(desc)
-                if ins:
-                    if ins.lastindex == 2:
-                        seq, tot = int(ins.group(1)), int(ins.group(2))
-                    elif ins.lastindex == 3:
-                        seq, tot = int(ins.group(3)), None
-                    elif ins.lastindex == 5:
-                        seq, tot = int(ins.group(4)), int(ins.group(5))
-                    else:
-                        seq, tot = None, None
-                    # Só aceita parcelas do ciclo atual
-                    if tot and seq and seq > tot:
-                        print(f"[PARCELA-ERR] Parcela fora do ciclo: {desc}")
-                        i += 1
-                        continue
-                else:
-                    seq, tot = None, None
-                cat = classify(desc, amt)
-                if cat == "DIVERSOS":
-                    print(f"[CAT-SUSPEITA] {desc}")
-                rows.append(build(card, md.group("date"), desc, amt, cat, ref_y, ref_m, installment_seq=seq, installment_tot=tot))
-                stats[cat.lower()] += 1
-                last_date = md.group("date")
-            i += 1
+        mfx = fx_blocks.get(i)
+        if mfx:
+            parts = line.split()
+            post_date = parts[0]
+            valor_brl = decomma(parts[-1])
+            desc = " ".join(parts[1:-1])
+            merchant_city = mfx["city"]
+            valor_orig = decomma(mfx["orig"])
+            moeda_orig = mfx["cur"]
+            valor_usd = decomma(mfx["usd"])
+            fx_rate = decomma_rate(mfx["fx"])
+            # Checagem de duplicatas FX: guarda só o hash de 64 bits, não a tupla com as strings
+            fx_key = hash((desc, post_date, valor_brl, valor_orig, moeda_orig, fx_rate))
+            if fx_key in seen_fx:
+                print(f"[DUPLICATE] Duplicata legítima confirmada: {desc} | {post_date} | {fmt_cents(valor_brl)}")
+            else:
+                seen_fx.add(fx_key)
+                emit(build(
+                    card, post_date, desc, valor_brl, "FX", ref_y, ref_m,
+                    valor_orig=valor_orig, moeda_orig=moeda_orig, valor_usd=valor_usd,
+                    fx_rate=fx_rate, merchant_city=merchant_city
+                ))
+                stats["fx"] += 1
+            i += 3  # AVANÇA 3 LINHAS!
             continue
-        # Substitua:
-        # m_iof = RE_IOF_LINE.search(ln_clean)
-        m_iof = RE_IOF_LINE.search(line)
-        if m_iof:
-            valor = decomma(m_iof.group(1))
-            iof_postings.append(build(card, last_date or "", "Repasse de IOF em R$", valor, "IOF", ref_y, ref_m, iof_brl=valor))
-            stats["iof"] += 1
+        # Sem data no início, só IOF/encargos podem casar: filtro literal antes do regex
+        line_lower = line.lower()
+        if line[:1].isdigit() or any(k in line_lower for k in LINE_KEYWORDS):
+            m = RE_LINE.match(line)
+        else:
+            m = None
+        if m and HANDLERS[m.lastgroup](m, line, ctx):
             i += 1
             continue
-        # if any(x in ln_clean.upper() for x in ("JUROS", "MULTA", "IOF DE FINANCIAMENTO")):
-        if any(x in line.upper() for x in ("JUROS", "MULTA", "IOF DE FINANCIAMENTO")):
-            mval = RE_BRL.search(line)
-            if mval:
-                valor = decomma(mval.group(0))
-                if valor != 0:
-                    rows.append(build(card, last_date or "", line, valor, "ENCARGOS", ref_y, ref_m))
-                    stats["encargos"] += 1
-                    i += 1
-                    continue
         stats["regex_miss"] += 1
         if verbose:
             prev_line = lines[i-1] if i > 0 else ""
@@ -296,137 +361,207 @@ def parse_txt(path: Path, ref_y: int, ref_m: int, verbose=False):
                 if next_line:
                     f.write(f"  [next] {next_line}\n")
         i += 1
-    rows.extend(iof_postings)
-    # Filtro final antes do CSV
-    rows = [r for r in rows if r.get("post_date") and r.get("valor_brl") not in ("", None)]
-    stats["postings"] = len(rows)
-    return rows, stats
+    for r in iof_postings:
+        emit(r)
+    return stats
+
+DOM_CATS = frozenset({"ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS", "FARMÁCIA", "SUPERMERCADO", "POSTO", "RESTAURANTE", "TURISMO"})
+KPI_DOM_CATS = frozenset({"ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS"})
+
+class Aggregator:
+    # KPIs, somas por categoria (centavos), extremos e checagem de ledger_hash, atualizados linha a linha
+    def __init__(self):
+        self.kpi, self.counts, self.sums, self.cards = Counter(), Counter(), Counter(), set()
+        self.min_pay = self.max_fx = self.min_fx = None
+        self.seen_hashes, self.dupes = set(), 0
+
+    def add(self, r):
+        cat = r["categoria_high"]; v = r["valor_brl"]
+        h = bytes.fromhex(r["ledger_hash"])
+        if h in self.seen_hashes:
+            print(f"[DUPLICATE] Linha duplicada: {r['desc_raw']} | {r['post_date']} | {fmt_cents(v)}")
+            self.dupes += 1
+        else:
+            self.seen_hashes.add(h)
+        kpi, counts, sums = self.kpi, self.counts, self.sums
+        if cat in KPI_DOM_CATS: kpi["domestic"] += 1
+        elif cat == "FX": kpi["fx"] += 1
+        elif cat == "SERVIÇOS": kpi["services"] += 1
+        else: kpi["misc"] += 1
+        self.cards.add(r["card_last4"])
+        sums["fatura_anterior"] += r.get("pagamento_fatura_anterior") or 0
+        sums["total"] += v
+        if cat in DOM_CATS:
+            counts["dom"] += 1; sums["dom"] += v
+        elif cat == "FX":
+            sums["fx_all"] += v
+            if r.get("valor_orig") and r.get("moeda_orig") and r.get("fx_rate"):
+                counts["fx"] += 1; sums["fx"] += v
+                self.max_fx = v if self.max_fx is None else max(self.max_fx, v)
+                self.min_fx = v if self.min_fx is None else min(self.min_fx, v)
+        elif cat == "SERVIÇOS":
+            sums["serv"] += v
+        elif cat == "AJUSTE":
+            counts["ajuste"] += 1; sums["ajuste"] += v
+        elif cat == "IOF":
+            sums["iof"] += r.get("iof_brl") or 0
+        if cat == "PAGAMENTO":
+            counts["pagamento"] += 1; sums["pagamento"] += v
+            self.min_pay = v if self.min_pay is None else min(self.min_pay, v)
+        elif cat != "AJUSTE":
+            sums["lancamentos"] += v
+        if v > 0 and cat not in ("PAGAMENTO", "AJUSTE"):
+            sums["debito"] += v
+        elif v < 0 and cat in ("PAGAMENTO", "AJUSTE"):
+            sums["credito"] += v
+        if v < 0:
+            sums["neg"] += v
+
+def file_sha1(path: Path, chunk=1 << 16):
+    # Impressão digital do arquivo em blocos de 64 KB, sem carregar o arquivo inteiro na memória
+    h = hashlib.sha1()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
 
 def log_block(tag, **kv):
     logging.info("%s | %-8s", datetime.now().strftime("%H:%M:%S"), tag)
     for k, v in kv.items():
         logging.info("           %-12s: %s", k, v)
 
+def init_worker():
+    # Cada processo filho precisa do próprio logging e tracemalloc (o start method pode ser spawn)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    tracemalloc.start()
+
+class OutputRecorder:
+    # Registra escritas (stream, texto) na ordem em que ocorreram, para o pai reemitir depois
+    def __init__(self, chunks, stream):
+        self.chunks, self.stream = chunks, stream
+
+    def write(self, text):
+        self.chunks.append((self.stream, text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+def process_one_buffered(f, verbose=False):
+    # Versão para o pool: prints e log_block ficam num buffer do arquivo em vez de irem
+    # direto para o terminal, onde se misturariam com a saída dos outros workers
+    chunks = []
+    handler = logging.StreamHandler(OutputRecorder(chunks, "err"))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root = logging.getLogger(); saved = root.handlers
+    root.handlers = [handler]
+    try:
+        with contextlib.redirect_stdout(OutputRecorder(chunks, "out")):
+            stats, sums = process_one(f, verbose)
+    finally:
+        root.handlers = saved
+    return stats, sums, chunks
+
+def replay(chunks):
+    for stream, text in chunks:
+        target = sys.stdout if stream == "out" else sys.stderr
+        target.write(text); target.flush()
+
+def process_one(f, verbose=False):
+    p = Path(f); m = re.search(r"(20\d{2})(\d{2})", p.stem); ry, rm = (int(m.group(1)), int(m.group(2))) if m else (datetime.date.today().year, datetime.date.today().month)
+    log_block("START", v=__version__, file=p.name, sha=file_sha1(p)[:8])
+    out = p.with_name(f"{p.stem}_done.csv"); agg = Aggregator()
+    with out.open("w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh); w.writerow(SCHEMA)
+        stats = parse_txt(p, ry, rm, w, agg, verbose)
+    kpi, counts, sums = agg.kpi, agg.counts, agg.sums
+    debitos = (sums["dom"] + sums["fx_all"] + sums["serv"]) / 100
+    neg_sum = sums["neg"] / 100
+    header_total = 20860.60
+    header_pagamentos = -21732.62
+            # --- NOVO: Métricas de referência extraídas do PDF/TXT ---
+    pdf_metrics = {
+        "Total da fatura anterior": 9232.62,
+        "Pagamentos efetuados": -21732.62,
+        "Saldo financiado": -12500.00,
+        "Lançamentos atuais": 33360.60,
+        "Total desta fatura": 20860.60,
+        "Nº de pagamentos 7117": 6,
+        "Valor total dos pagamentos": -21732.62,
+        "Valor do maior pagamento": -9232.62,
+        "Nº de compras domésticas": 78,
+        "Valor total compras domésticas": 7792.56,
+        "Nº de compras internacionais": 71,
+        "Valor total compras internacionais (BRL)": 18574.30,
+        "Valor total lançamentos internacionais (BRL)": 19202.05,
+        "Valor total IOF internacional": 627.75,
+        "Maior compra internacional": 2650.68,
+        "Menor compra internacional": 5.94,
+        "Nº de cartões diferentes": 4,
+        "Valor total de produtos/serviços": 293.53,
+        "Nº de ajustes negativos": 10,
+        "Valor total ajustes negativos": -0.92,
+        "Saldo calculado": 20860.60,
+    }
+    # --- NOVO: Métricas extraídas do CSV ---
+    # Pagamentos: só do ciclo atual; FX: só se campos de metadados estiverem preenchidos
+    csv_metrics = {
+        "Total da fatura anterior": sums["fatura_anterior"] / 100,
+        "Pagamentos efetuados": sums["pagamento"] / 100,
+        "Saldo financiado": 0,
+        "Lançamentos atuais": sums["lancamentos"] / 100,
+        "Total desta fatura": sums["total"] / 100,
+        "Nº de pagamentos 7117": counts["pagamento"],
+        "Valor total dos pagamentos": sums["pagamento"] / 100,
+        "Valor do maior pagamento": (agg.min_pay or 0) / 100,
+        "Nº de compras domésticas": counts["dom"],
+        "Valor total compras domésticas": sums["dom"] / 100,
+        "Nº de compras internacionais": counts["fx"],
+        "Valor total compras internacionais (BRL)": sums["fx"] / 100,
+        "Valor total lançamentos internacionais (BRL)": (sums["fx"] + sums["iof"]) / 100,
+        "Valor total IOF internacional": sums["iof"] / 100,
+        "Maior compra internacional": (agg.max_fx or 0) / 100,
+        "Menor compra internacional": (agg.min_fx or 0) / 100,
+        "Nº de cartões diferentes": len(agg.cards),
+        "Valor total de produtos/serviços": sums["serv"] / 100,
+        "Nº de ajustes negativos": counts["ajuste"],
+        "Valor total ajustes negativos": sums["ajuste"] / 100,
+        "Saldo calculado": sums["total"] / 100,
+    }
+    compare_metrics(pdf_metrics, csv_metrics)
+    log_block("TOTAL", Débitos=f"{debitos:,.2f}", Créditos=f"{neg_sum:,.2f}", Net=f"{debitos+neg_sum:,.2f}")
+    log_block("POSTINGS", rows=stats["postings"], dom=kpi["domestic"], fx=kpi["fx"], ajustes=kpi["ajuste"], pagamentos=kpi["pagamento"])
+    log_block("KPIS", miss=stats["regex_miss"], acc=f"{100*(stats['lines']-stats['hdr_drop']-stats['regex_miss'])/max(stats['lines']-stats['hdr_drop'],1):.1f}%")
+    size_kb = out.stat().st_size // 1024; log_block("FILES", in_=p.name, out=f"{out.name} ({size_kb} KB)")
+    mem = tracemalloc.get_traced_memory()[1] // 1024 ** 2; log_block("MEM", peak=f"{mem} MB"); log_block("END", result="SUCCESS")
+    return stats, sums
+
 def main():
     tracemalloc.start()
     ap = argparse.ArgumentParser(); ap.add_argument("files", nargs="+"); ap.add_argument("-v", "--verbose", action="store_true")
     a = ap.parse_args(); logging.basicConfig(level=logging.INFO, format="%(message)s")
     total = Counter(); t0 = time.perf_counter()
-    for f in a.files:
-        p = Path(f); m = re.search(r"(20\d{2})(\d{2})", p.stem); ry, rm = (int(m.group(1)), int(m.group(2))) if m else (datetime.date.today().year, datetime.date.today().month)
-        log_block("START", v=__version__, file=p.name, sha=hashlib.sha1(p.read_bytes()).hexdigest()[:8])
-        rows, stats = parse_txt(p, ry, rm, a.verbose); total += stats
-        rows_dedup = rows
-        # Checagem de duplicatas por ledger_hash
-        seen_hashes = set()
-        dupes = 0
-        for r in rows:
-            if r["ledger_hash"] in seen_hashes:
-                print(f"[DUPLICATE] Linha duplicada: {r['desc_raw']} | {r['post_date']} | {r['valor_brl']}")
-                dupes += 1
-            else:
-                seen_hashes.add(r["ledger_hash"])
-        rows_dedup = rows  # Mantém todas as linhas para rastreabilidade
-        kpi = Counter()
-        for r in rows_dedup:
-            if r["categoria_high"] in ("ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS"): kpi['domestic'] += 1
-            elif r["categoria_high"] == "FX": kpi['fx'] += 1
-            elif r["categoria_high"] in ("SERVIÇOS",): kpi['services'] += 1
-            else: kpi['misc'] += 1
-        brl_dom = sum(r["valor_brl"] for r in rows_dedup if r["categoria_high"] in ("ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS", "FARMÁCIA", "SUPERMERCADO", "POSTO", "RESTAURANTE", "TURISMO"))
-        brl_fx = sum(r["valor_brl"] for r in rows_dedup if r["categoria_high"] == "FX")
-        brl_serv = sum(r["valor_brl"] for r in rows_dedup if r["categoria_high"] == "SERVIÇOS")
-        neg_rows = sum(1 for r in rows_dedup if r.get("valor_brl") not in ("", None) and Decimal(str(r["valor_brl"])) < 0)
-        neg_sum = sum(Decimal(str(r["valor_brl"])) for r in rows_dedup if r.get("valor_brl") not in ("", None) and Decimal(str(r["valor_brl"])) < 0)
-        header_total = 20860.60
-        header_pagamentos = -21732.62
-                # --- NOVO: Métricas de referência extraídas do PDF/TXT ---
-        pdf_metrics = {
-            "Total da fatura anterior": 9232.62,
-            "Pagamentos efetuados": -21732.62,
-            "Saldo financiado": -12500.00,
-            "Lançamentos atuais": 33360.60,
-            "Total desta fatura": 20860.60,
-            "Nº de pagamentos 7117": 6,
-            "Valor total dos pagamentos": -21732.62,
-            "Valor do maior pagamento": -9232.62,
-            "Nº de compras domésticas": 78,
-            "Valor total compras domésticas": 7792.56,
-            "Nº de compras internacionais": 71,
-            "Valor total compras internacionais (BRL)": 18574.30,
-            "Valor total lançamentos internacionais (BRL)": 19202.05,
-            "Valor total IOF internacional": 627.75,
-            "Maior compra internacional": 2650.68,
-            "Menor compra internacional": 5.94,
-            "Nº de cartões diferentes": 4,
-            "Valor total de produtos/serviços": 293.53,
-            "Nº de ajustes negativos": 10,
-            "Valor total ajustes negativos": -0.92,
-            "Saldo calculado": 20860.60,
-        }
-        # --- NOVO: Métricas extraídas do CSV ---
-        # Pagamentos: só do ciclo atual (ignora o primeiro, que está em pagamento_fatura_anterior)
-        pagamentos_csv = [r for r in rows_dedup if r["categoria_high"] == "PAGAMENTO" and r.get("valor_brl") not in ("", None)]
-        pagamentos_ciclo = pagamentos_csv
-        # FX: só se campos de metadados estiverem preenchidos
-        fx_rows = [r for r in rows_dedup if r["categoria_high"] == "FX" and r.get("valor_orig") and r.get("moeda_orig") and r.get("fx_rate")]
-        csv_metrics = {
-            "Total da fatura anterior": sum(float(r.get("pagamento_fatura_anterior", 0) or 0) for r in rows_dedup),
-            "Pagamentos efetuados": sum(float(r["valor_brl"]) for r in pagamentos_ciclo),
-            "Saldo financiado": 0,
-            "Lançamentos atuais": sum(
-                float(r["valor_brl"]) for r in rows_dedup
-                if r["categoria_high"] not in ("PAGAMENTO", "AJUSTE") and (r.get("valor_brl") not in ("", None))
-            ),
-            "Total desta fatura": sum(float(r["valor_brl"]) for r in rows_dedup if r.get("valor_brl") not in ("", None)),
-            "Nº de pagamentos 7117": len(pagamentos_ciclo),
-            "Valor total dos pagamentos": sum(float(r["valor_brl"]) for r in pagamentos_ciclo),
-            "Valor do maior pagamento": min((float(r["valor_brl"]) for r in pagamentos_ciclo), default=0),
-            "Nº de compras domésticas": sum(1 for r in rows_dedup if r["categoria_high"] in ("ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS", "FARMÁCIA", "SUPERMERCADO", "POSTO", "RESTAURANTE", "TURISMO")),
-            "Valor total compras domésticas": sum(float(r["valor_brl"]) for r in rows_dedup if r["categoria_high"] in ("ALIMENTAÇÃO", "SAÚDE", "VESTUÁRIO", "VEÍCULOS", "FARMÁCIA", "SUPERMERCADO", "POSTO", "RESTAURANTE", "TURISMO")),
-            "Nº de compras internacionais": len(fx_rows),
-            "Valor total compras internacionais (BRL)": sum(float(r["valor_brl"]) for r in fx_rows),
-            "Valor total lançamentos internacionais (BRL)": sum(float(r["valor_brl"]) for r in fx_rows) + sum(float(r.get("iof_brl", 0) or 0) for r in rows_dedup if r["categoria_high"] == "IOF"),
-            "Valor total IOF internacional": sum(float(r.get("iof_brl", 0) or 0) for r in rows_dedup if r["categoria_high"] == "IOF"),
-            "Maior compra internacional": max((float(r["valor_brl"]) for r in fx_rows), default=0),
-            "Menor compra internacional": min((float(r["valor_brl"]) for r in fx_rows), default=0),
-            "Nº de cartões diferentes": len(set(r["card_last4"] for r in rows_dedup)),
-            "Valor total de produtos/serviços": sum(float(r["valor_brl"]) for r in rows_dedup if r["categoria_high"] == "SERVIÇOS"),
-            "Nº de ajustes negativos": sum(1 for r in rows_dedup if r["categoria_high"] == "AJUSTE"),
-            "Valor total ajustes negativos": sum(float(r["valor_brl"]) for r in rows_dedup if r["categoria_high"] == "AJUSTE"),
-            "Saldo calculado": sum(float(r["valor_brl"]) for r in rows_dedup if r.get("valor_brl") not in ("", None)),
-        }
-        compare_metrics(pdf_metrics, csv_metrics)
-        log_block("TOTAL", Débitos=f"{brl_dom+brl_fx+brl_serv:,.2f}", Créditos=f"{neg_sum:,.2f}", Net=f"{brl_dom+brl_fx+brl_serv+neg_sum:,.2f}")
-        log_block("POSTINGS", rows=len(rows_dedup), dom=kpi["domestic"], fx=kpi["fx"], ajustes=kpi["ajuste"], pagamentos=kpi["pagamento"])
-        log_block("KPIS", miss=stats["regex_miss"], acc=f"{100*(stats['lines']-stats['hdr_drop']-stats['regex_miss'])/max(stats['lines']-stats['hdr_drop'],1):.1f}%")
-        out = p.with_name(f"{p.stem}_done.csv"); out.write_text("")
-        with out.open("w", newline="", encoding="utf-8") as fh:
-            w = csv.DictWriter(fh, fieldnames=SCHEMA); w.writeheader(); w.writerows(rows_dedup)
-        size_kb = out.stat().st_size // 1024; log_block("FILES", in_=p.name, out=f"{out.name} ({size_kb} KB)")
-        mem = tracemalloc.get_traced_memory()[1] // 1024 ** 2; log_block("MEM", peak=f"{mem} MB"); log_block("END", result="SUCCESS")
+    # Arquivos são independentes: com mais de um, cada um vai para um processo (cada um grava seu _done.csv).
+    # A saída de cada arquivo volta bufferizada e é reemitida na ordem de a.files, igual à execução sequencial
+    workers = min(len(a.files), os.cpu_count() or 1)
+    if workers > 1:
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as ex:
+            for stats, sums, chunks in ex.map(process_one_buffered, a.files, repeat(a.verbose)):
+                replay(chunks)
+                results.append((stats, sums))
+    else:
+        results = [process_one(f, a.verbose) for f in a.files]
+    for stats, sums in results:
+        total += stats
     dur = time.perf_counter() - t0; eff_g = total["lines"] - total["hdr_drop"]; acc_g = 100 * (eff_g - total["regex_miss"]) / max(eff_g, 1)
     log_block("SUMMARY", files=len(a.files), postings=total["postings"], miss=total["regex_miss"], acc=f"{acc_g:.1f}%", dur=f"{dur:.2f}s")
 
-    # Após parsing e antes de escrever no CSV:
-    rows_validos = [r for r in rows if r.get("post_date") and r.get("valor_brl") not in ("", None)]
-
-    debito_total = sum(
-        float(r["valor_brl"]) for r in rows_validos
-        if float(r["valor_brl"]) > 0 and r["categoria_high"] not in ("PAGAMENTO", "AJUSTE")
-    )
-    credito_total = sum(
-        float(r["valor_brl"]) for r in rows_validos
-        if float(r["valor_brl"]) < 0 and r["categoria_high"] in ("PAGAMENTO", "AJUSTE")
-    )
+    # Reconciliação do último arquivo processado
+    debito_total, credito_total = sums["debito"] / 100, sums["credito"] / 100
     valor_total_fatura = debito_total + credito_total
 
     print(f"[RECONCILIACAO] Débitos: {debito_total:.2f} | Créditos: {credito_total:.2f} | Total fatura: {valor_total_fatura:.2f}")
 
-    # Atualize as métricas do CSV para refletir os novos totais
-    csv_metrics["Débitos"] = debito_total
-    csv_metrics["Créditos"] = credito_total
-    csv_metrics["Saldo calculado"] = valor_total_fatura
-
 if __name__ == "__main__":
     main()